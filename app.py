@@ -1,16 +1,25 @@
 import os
+import re
 import csv
+import gzip
+import hashlib
+import hmac
+import threading
+import time
+from collections import namedtuple
 import certifi
-from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO, TextIOWrapper
 from datetime import datetime, timezone, timedelta
 
 from flask import (
-    Flask, request, redirect, url_for, render_template_string,
-    flash, session, send_file, Response, abort
+    Flask, request, redirect, url_for, render_template, make_response,
+    flash, session, Response, abort
 )
-from jinja2 import DictLoader
+from jinja2 import ChoiceLoader, DictLoader
 
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo import MongoClient, ASCENDING, DESCENDING, InsertOne, ReturnDocument
+from pymongo.errors import BulkWriteError, OperationFailure
 from bson.objectid import ObjectId
 import gridfs
 
@@ -28,12 +37,22 @@ except Exception:
 # ------------------------------
 APP_TITLE = "Bookkeeping"
 ALLOWED_EXT = {"png", "jpg", "jpeg", "pdf"}
+PAGE_SIZE = 50
+IMPORT_BATCH_SIZE = 1000
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("SECRET_KEY", os.urandom(24))
+app.config["MAX_CONTENT_LENGTH"] = 25 * 1024 * 1024  # matches the 25MB limit shown in the UI
 
 APP_USERNAME = os.environ.get("APP_USERNAME", "admin")
-APP_PASSWORD = os.environ.get("APP_PASSWORD", "changeme")
+
+# Only a salted scrypt hash of the password is kept in memory
+_PW_SALT = os.urandom(16)
+
+def _hash_password(pw: str) -> bytes:
+    return hashlib.scrypt(pw.encode(), salt=_PW_SALT, n=2**14, r=8, p=1)
+
+APP_PASSWORD_HASH = _hash_password(os.environ.get("APP_PASSWORD", "changeme"))
 
 # ------------------------------
 # MongoDB / GridFS (Atlas)
@@ -46,18 +65,47 @@ if not MONGODB_URI:
 mongo_client = MongoClient(
     MONGODB_URI,
     tlsCAFile=certifi.where(),   # 👈 makes SSL work on Render
-    serverSelectionTimeoutMS=30000
+    serverSelectionTimeoutMS=30000,
+    maxPoolSize=50,
+    minPoolSize=5,
+    compressors="zstd,zlib",     # zstd via pymongo[zstd]; zlib is the stdlib fallback
+    retryWrites=True,
 )
 
 mdb = mongo_client[MONGODB_DB]
 expenses_col = mdb["expenses"]
 fs = gridfs.GridFS(mdb)
 
+# Background workers for GridFS uploads/cleanup so responses don't wait on them
+executor = ThreadPoolExecutor(max_workers=8)
+# Each pending upload holds its receipt bytes (up to 25MB) in memory, so cap
+# how many can be in flight; past the cap uploads are saved inline
+MAX_PENDING_UPLOADS = 8
+_upload_slots = threading.BoundedSemaphore(MAX_PENDING_UPLOADS)
+
+# Fields the expense tables actually render (_id is always included)
+LIST_PROJECTION = {"date": 1, "vendor": 1, "category": 1, "amount": 1, "notes": 1, "receipt_id": 1}
+EXPORT_PROJECTION = {**LIST_PROJECTION, "created_at": 1}
+
 # Helpful indexes (idempotent)
-expenses_col.create_index([("date", DESCENDING)])
-expenses_col.create_index([("category", ASCENDING)])
 expenses_col.create_index([("amount", DESCENDING)])
-expenses_col.create_index([("vendor", ASCENDING)])
+# Lower-cased copy of vendor so 'abc*' prefix search is case-insensitive
+# and still an anchored, index-backed regex; backfill older documents
+expenses_col.create_index([("vendor_lc", ASCENDING)])
+expenses_col.update_many(
+    {"vendor_lc": {"$exists": False}},
+    [{"$set": {"vendor_lc": {"$toLower": {"$ifNull": ["$vendor", ""]}}}}],
+)
+expenses_col.create_index([("category", ASCENDING), ("date", DESCENDING)])
+# _id breaks date ties so newest-first order is stable across pages
+expenses_col.create_index([("date", DESCENDING), ("_id", DESCENDING)])
+expenses_col.create_index([("vendor", "text"), ("notes", "text")], name="search_text")
+# Drop indexes made redundant by the indexes above
+for _name in ("category_1", "date_-1", "date_-1_category_1", "vendor_1"):
+    try:
+        expenses_col.drop_index(_name)
+    except OperationFailure:
+        pass
 
 # ------------------------------
 # Helpers
@@ -65,50 +113,127 @@ expenses_col.create_index([("vendor", ASCENDING)])
 def allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXT
 
+_OID_RE = re.compile(r"[0-9a-fA-F]{24}")
+
 def _oid(id_str):
-    try:
-        return ObjectId(id_str)
-    except Exception:
+    # Cheap shape check up front instead of relying on ObjectId() raising
+    if not _OID_RE.fullmatch(id_str):
         abort(404)
+    return ObjectId(id_str)
 
 def _parse_date(s):
     if not s:
         return None
     return datetime.strptime(s, "%Y-%m-%d").replace(tzinfo=timezone.utc)
 
+MAX_PAGE = 10**6  # keeps (page - 1) * PAGE_SIZE well inside BSON's int64
+
+def _parse_page(s):
+    try:
+        return min(max(int(s), 1), MAX_PAGE)
+    except (TypeError, ValueError):
+        return 1
+
+def _search_filter(search):
+    """Vendor/notes search via the text index; 'abc*' is a case-insensitive vendor prefix match."""
+    search = search.strip()
+    if search.endswith("*"):
+        prefix = search.rstrip("*").strip()
+        if not prefix:
+            return {}
+        return {"vendor_lc": {"$regex": "^" + re.escape(prefix.lower())}}
+    # Whitespace-only input means no search, not a search matching nothing
+    if not search:
+        return {}
+    # Several words are searched as one phrase rather than any-of-the-words
+    if " " in search:
+        search = '"%s"' % search.replace('"', "")
+    return {"$text": {"$search": search}}
+
 def _now_utc():
     return datetime.now(timezone.utc)
 
+Row = namedtuple("Row", "id date vendor category amount notes receipt_id")
+
 def _serialize_expense(doc):
-    """Convert Mongo doc to template-friendly dict and format date."""
-    d = dict(doc)
-    d["id"] = str(d.pop("_id"))
-    if d.get("receipt_id"):
-        d["receipt_id"] = str(d["receipt_id"])
-    # Ensure keys expected by templates exist
-    d["vendor"] = d.get("vendor", "")
-    d["category"] = d.get("category", "")
-    d["notes"] = d.get("notes", "")
-    # Format date for <input type="date"> and table display
-    if isinstance(d.get("date"), datetime):
-        d["date"] = d["date"].strftime("%Y-%m-%d")
-    return d
-
-def _save_receipt(file_storage):
-    """Save uploaded file to GridFS; return ObjectId or None."""
+    """Convert Mongo doc to a template-friendly Row with the date formatted."""
+    dt = doc.get("date")
+    if isinstance(dt, datetime):
+        # Format for <input type="date"> and table display
+        dt = f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d}"
+    receipt_id = doc.get("receipt_id")
+    return Row(
+        str(doc["_id"]),
+        dt,
+        doc.get("vendor", ""),
+        doc.get("category", ""),
+        doc.get("amount", 0.0),
+        doc.get("notes", ""),
+        str(receipt_id) if receipt_id else None,
+    )
+
+def _read_receipt(file_storage):
+    """Validate an upload and read it; return (content, filename, content_type) or None."""
     if not file_storage or not getattr(file_storage, "filename", ""):
         return None
     if not allowed_file(file_storage.filename):
         return None
-    filename = secure_filename(file_storage.filename)
-    content = file_storage.read()
-    return fs.put(
-        content,
-        filename=filename,
-        content_type=file_storage.mimetype or "application/octet-stream",
-        uploadDate=_now_utc(),
+    # Read now: the upload stream is closed once the request ends, and the
+    # GridFS write happens later on a worker thread
+    return (
+        file_storage.read(),
+        secure_filename(file_storage.filename),
+        file_storage.mimetype or "application/octet-stream",
     )
 
+def _save_and_link(expense_id, receipt, token):
+    """Background task: store a receipt in GridFS and point the expense at it.
+
+    The link only applies while the expense still carries this upload's
+    receipt_pending token, so the latest add/edit wins however the uploads finish.
+    """
+    content, filename, content_type = receipt
+    try:
+        receipt_oid = fs.put(content, filename=filename, content_type=content_type, uploadDate=_now_utc())
+        old = expenses_col.find_one_and_update(
+            {"_id": expense_id, "receipt_pending": token},
+            {"$set": {"receipt_id": receipt_oid}, "$unset": {"receipt_pending": ""}},
+            projection={"receipt_id": 1},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if not old:
+            # Expense was deleted, or a later edit queued a newer receipt
+            _delete_receipt(receipt_oid)
+            return True
+        _delete_receipt(old.get("receipt_id"))
+        return True
+    except Exception:
+        app.logger.exception("Saving receipt for expense %s failed", expense_id)
+        return False
+
+def _store_receipt(expense_id, receipt, token):
+    """Queue _save_and_link on the executor, or run it inline when the upload cap is reached.
+
+    Returns "queued", "saved" or "failed" so the caller can tell the user.
+    """
+    if not _upload_slots.acquire(blocking=False):
+        return "saved" if _save_and_link(expense_id, receipt, token) else "failed"
+    try:
+        future = executor.submit(_save_and_link, expense_id, receipt, token)
+    except Exception:
+        _upload_slots.release()
+        raise
+    future.add_done_callback(lambda _: _upload_slots.release())
+    return "queued"
+
+def _flash_saved(action, receipt_status=None):
+    if receipt_status == "queued":
+        flash(f"Expense {action}. Receipt is still processing and will appear shortly.", "success")
+    elif receipt_status == "failed":
+        flash(f"Expense {action}, but the receipt could not be saved. Please upload it again.", "error")
+    else:
+        flash(f"Expense {action}.", "success")
+
 def _delete_receipt(receipt_id):
     if not receipt_id:
         return
@@ -117,6 +242,29 @@ def _delete_receipt(receipt_id):
     except Exception:
         pass
 
+# Distinct categories change only on add/edit/delete, so keep them
+# in-process and drop the cache after each write. The TTL bounds staleness
+# when another gunicorn worker did the write.
+CATEGORIES_TTL = 60  # seconds
+_categories_cache = None
+_categories_cached_at = 0.0
+_categories_lock = threading.Lock()
+
+def _get_categories():
+    global _categories_cache, _categories_cached_at
+    with _categories_lock:
+        now = time.monotonic()
+        if _categories_cache is None or now - _categories_cached_at >= CATEGORIES_TTL:
+            cats = expenses_col.distinct("category")
+            _categories_cache = sorted([c for c in cats if c], key=lambda x: x.lower())
+            _categories_cached_at = now
+        return _categories_cache
+
+def _invalidate_categories():
+    global _categories_cache
+    with _categories_lock:
+        _categories_cache = None
+
 def require_login(f):
     from functools import wraps
     @wraps(f)
@@ -129,18 +277,30 @@ def require_login(f):
 # ------------------------------
 # Auth routes
 # ------------------------------
+# The login page has only two variants (plain, and with the bad-credentials
+# message), so render each once and reuse the bytes (lazily, since url_for
+# needs a request context)
+_login_html = {}
+
+def _login_page(error=None):
+    if error not in _login_html:
+        _login_html[error] = render_template("login.html", title=APP_TITLE, error=error).encode()
+    return _login_html[error]
+
 @app.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
         u = request.form.get("username", "")
         p = request.form.get("password", "")
-        if u == APP_USERNAME and p == APP_PASSWORD:
+        # Constant-time compares; evaluate both so timing doesn't reveal which failed
+        user_ok = hmac.compare_digest(u.encode(), APP_USERNAME.encode())
+        pw_ok = hmac.compare_digest(_hash_password(p), APP_PASSWORD_HASH)
+        if user_ok and pw_ok:
             session["authed"] = True
             nxt = request.args.get("next") or url_for("index")
             return redirect(nxt)
-        flash("Invalid credentials.", "error")
-        return redirect(url_for("login"))
-    return render_template_string(LOGIN_TEMPLATE, title=APP_TITLE, css=BASE_CSS)
+        return Response(_login_page("Invalid credentials."), mimetype="text/html")
+    return Response(_login_page(), mimetype="text/html")
 
 @app.route("/logout")
 @require_login
@@ -155,43 +315,54 @@ def logout():
 @app.route("/dashboard")
 @require_login
 def index():
-    # Total spend
-    total_doc = list(expenses_col.aggregate([
-        {"$group": {"_id": None, "sum": {"$sum": "$amount"}}}
-    ]))
-    total = total_doc[0]["sum"] if total_doc else 0.0
-
-    # This month spend
     now = _now_utc()
     month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     next_month = (month_start.replace(day=28) + timedelta(days=4)).replace(day=1)
-    tm_doc = list(expenses_col.aggregate([
-        {"$match": {"date": {"$gte": month_start, "$lt": next_month}}},
-        {"$group": {"_id": None, "sum": {"$sum": "$amount"}}}
-    ]))
-    this_month = tm_doc[0]["sum"] if tm_doc else 0.0
-
-    # Top 5 categories by spend
-    top_cats = list(expenses_col.aggregate([
-        {"$group": {"_id": "$category", "sum": {"$sum": "$amount"}}},
-        {"$sort": {"sum": -1}},
-        {"$limit": 5}
-    ]))
-    top_categories = [{"category": (x["_id"] or "Uncategorized"), "sum": x["sum"]} for x in top_cats]
-
-    # Recent 10
-    recent = expenses_col.find({}).sort("date", DESCENDING).limit(10)
-    recent_rows = [_serialize_expense(d) for d in recent]
-
-    return render_template_string(
-        DASHBOARD_TEMPLATE,
+    in_month = {"$and": [{"$gte": ["$date", month_start]}, {"$lt": ["$date", next_month]}]}
+
+    # All dashboard data in one round-trip: total + this month spend,
+    # top 5 categories by spend, and the 10 most recent expenses
+    dash = list(expenses_col.aggregate([
+        {"$facet": {
+            "kpis": [
+                {"$group": {
+                    "_id": None,
+                    "total": {"$sum": "$amount"},
+                    "this_month": {"$sum": {"$cond": [in_month, "$amount", 0]}},
+                }}
+            ],
+            "top": [
+                {"$group": {"_id": "$category", "sum": {"$sum": "$amount"}}},
+                {"$sort": {"sum": -1}},
+                {"$limit": 5}
+            ],
+            "recent": [
+                {"$sort": {"date": -1, "_id": -1}},
+                {"$limit": 10},
+                {"$project": LIST_PROJECTION},
+            ],
+        }}
+    ]))[0]
+
+    kpis = dash["kpis"][0] if dash["kpis"] else {}
+    total = kpis.get("total", 0.0)
+    this_month = kpis.get("this_month", 0.0)
+    top_categories = [{"category": (x["_id"] or "Uncategorized"), "sum": x["sum"]} for x in dash["top"]]
+    recent_rows = [_serialize_expense(d) for d in dash["recent"]]
+
+    resp = make_response(render_template(
+        "dashboard.html",
         title=APP_TITLE,
-        css=BASE_CSS,
         total=total,
         this_month=this_month,
         top_categories=top_categories,
         recent=recent_rows
-    )
+    ))
+    # Let the browser revalidate with If-None-Match and get a 304 when the
+    # rendered dashboard hasn't changed since its last view
+    resp.headers["Cache-Control"] = "private, no-cache"
+    resp.add_etag()
+    return resp.make_conditional(request)
 
 # ------------------------------
 # Expenses list + filters
@@ -218,35 +389,43 @@ def expenses():
             q["date"]["$lt"] = (end_dt + timedelta(days=1))  # inclusive to end-of-day
 
     if search:
-        q["$or"] = [
-            {"vendor": {"$regex": search, "$options": "i"}},
-            {"notes": {"$regex": search, "$options": "i"}},
-        ]
-
-    cursor = expenses_col.find(q).sort("date", DESCENDING)
-    rows = [_serialize_expense(d) for d in cursor]
+        q.update(_search_filter(search))
 
-    # filtered total
-    ftotal_doc = list(expenses_col.aggregate([
+    # One page of rows + filtered total and count from a single filtered pass
+    page = _parse_page(request.args.get("page"))
+    result = list(expenses_col.aggregate([
         {"$match": q},
-        {"$group": {"_id": None, "sum": {"$sum": "$amount"}}}
-    ]))
-    filtered_total = ftotal_doc[0]["sum"] if ftotal_doc else 0.0
+        {"$project": LIST_PROJECTION},
+        {"$facet": {
+            "rows": [
+                {"$sort": {"date": -1, "_id": -1}},
+                {"$skip": (page - 1) * PAGE_SIZE},
+                {"$limit": PAGE_SIZE},
+            ],
+            "total": [{"$group": {"_id": None, "sum": {"$sum": "$amount"}}}],
+            "count": [{"$count": "n"}],
+        }}
+    ]))[0]
+    rows = [_serialize_expense(d) for d in result["rows"]]
+    filtered_total = result["total"][0]["sum"] if result["total"] else 0.0
+    count = result["count"][0]["n"] if result["count"] else 0
+    pages = max(1, -(-count // PAGE_SIZE))
 
     # category list for dropdown
-    cats = expenses_col.distinct("category")
-    cats = sorted([c for c in cats if c], key=lambda x: x.lower())
+    cats = _get_categories()
 
     filters = {"start": start, "end": end, "category": category, "search": search}
 
-    return render_template_string(
-        INDEX_TEMPLATE,
+    return render_template(
+        "expenses.html",
         title=APP_TITLE,
-        css=BASE_CSS,
         rows=rows,
         total=filtered_total,
         categories=cats,
-        filters=filters
+        filters=filters,
+        count=count,
+        page=page,
+        pages=pages
     )
 
 # ------------------------------
@@ -270,27 +449,29 @@ def add():
 
         date_dt = _parse_date(date_str) or _now_utc()
 
-        # Receipt to GridFS
-        receipt_file = request.files.get("receipt")
-        receipt_oid = _save_receipt(receipt_file)
+        receipt = _read_receipt(request.files.get("receipt"))
 
         doc = {
             "date": date_dt,
             "vendor": vendor,
+            "vendor_lc": vendor.lower(),
             "category": category,
             "amount": amount_val,
             "notes": notes,
             "created_at": _now_utc(),
             "updated_at": _now_utc(),
         }
-        if receipt_oid:
-            doc["receipt_id"] = receipt_oid
-
-        expenses_col.insert_one(doc)
-        flash("Expense added.", "success")
+        if receipt:
+            doc["receipt_pending"] = ObjectId()
+
+        # Insert first, then upload the receipt to GridFS in the background
+        # and link it to the new expense once stored
+        inserted_id = expenses_col.insert_one(doc).inserted_id
+        _invalidate_categories()
+        _flash_saved("added", _store_receipt(inserted_id, receipt, doc["receipt_pending"]) if receipt else None)
         return redirect(url_for("expenses"))
 
-    return render_template_string(ADD_TEMPLATE, title=APP_TITLE, css=BASE_CSS)
+    return render_template("add.html", title=APP_TITLE)
 
 # ------------------------------
 # Edit expense
@@ -299,47 +480,48 @@ def add():
 @require_login
 def edit(expense_id):
     oid = _oid(expense_id)
-    doc = expenses_col.find_one({"_id": oid})
-    if not doc:
-        abort(404)
 
     if request.method == "POST":
-        date_str = request.form.get("date") or None
-        vendor = (request.form.get("vendor") or doc.get("vendor") or "").strip()
-        category = (request.form.get("category") or doc.get("category") or "").strip()
-        amount = (request.form.get("amount") or doc.get("amount") or "").strip()
-        notes = (request.form.get("notes") or doc.get("notes") or "").strip()
-
-        try:
-            amount_val = float(amount)
-        except ValueError:
-            flash("Amount must be a number.", "error")
-            return redirect(url_for("edit", expense_id=expense_id))
-
-        date_dt = _parse_date(date_str) if date_str else (doc.get("date") or _now_utc())
-
-        set_fields = {
-            "date": date_dt,
-            "vendor": vendor,
-            "category": category,
-            "amount": amount_val,
-            "notes": notes,
-            "updated_at": _now_utc(),
-        }
-
-        # Optional receipt replacement
-        receipt_file = request.files.get("receipt")
-        if receipt_file and receipt_file.filename:
-            new_oid = _save_receipt(receipt_file)
-            if doc.get("receipt_id"):
-                _delete_receipt(doc["receipt_id"])
-            set_fields["receipt_id"] = new_oid
+        # Blank fields keep their current value, so only submitted ones are
+        # $set; this lets the save be a single update_one
+        set_fields = {"updated_at": _now_utc()}
+        for field in ("vendor", "category", "notes"):
+            value = request.form.get(field)
+            if value:
+                set_fields[field] = value.strip()
+        if "vendor" in set_fields:
+            set_fields["vendor_lc"] = set_fields["vendor"].lower()
+
+        amount = request.form.get("amount")
+        if amount:
+            try:
+                set_fields["amount"] = float(amount.strip())
+            except ValueError:
+                flash("Amount must be a number.", "error")
+                return redirect(url_for("edit", expense_id=expense_id))
 
-        expenses_col.update_one({"_id": oid}, {"$set": set_fields})
-        flash("Expense updated.", "success")
+        date_str = request.form.get("date")
+        if date_str:
+            set_fields["date"] = _parse_date(date_str)
+
+        # Optional receipt replacement, uploaded in the background; the old
+        # receipt is removed once the new one is linked. A fresh token marks
+        # this edit's upload as the one to keep if edits overlap
+        receipt = _read_receipt(request.files.get("receipt"))
+        if receipt:
+            set_fields["receipt_pending"] = ObjectId()
+
+        res = expenses_col.update_one({"_id": oid}, {"$set": set_fields})
+        if not res.matched_count:
+            abort(404)
+        _invalidate_categories()
+        _flash_saved("updated", _store_receipt(oid, receipt, set_fields["receipt_pending"]) if receipt else None)
         return redirect(url_for("expenses"))
 
-    return render_template_string(EDIT_TEMPLATE, title=APP_TITLE, css=BASE_CSS, row=_serialize_expense(doc))
+    doc = expenses_col.find_one({"_id": oid}, LIST_PROJECTION)
+    if not doc:
+        abort(404)
+    return render_template("edit.html", title=APP_TITLE, row=_serialize_expense(doc))
 
 # ------------------------------
 # Delete expense
@@ -352,10 +534,10 @@ def delete(expense_id):
     if not doc:
         abort(404)
 
-    if doc.get("receipt_id"):
-        _delete_receipt(doc["receipt_id"])
-
     expenses_col.delete_one({"_id": oid})
+    _invalidate_categories()
+    if doc.get("receipt_id"):
+        executor.submit(_delete_receipt, doc["receipt_id"])
     flash("Expense deleted.", "success")
     return redirect(url_for("expenses"))
 
@@ -366,18 +548,37 @@ def delete(expense_id):
 @require_login
 def receipts(id):
     oid = _oid(id)
+    # A GridFS file id never points at different bytes, so it is a strong
+    # ETag and a revalidation can be answered without touching GridFS
+    etag = str(oid)
+    cache_control = "private, max-age=31536000, immutable"
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers={"ETag": f'"{etag}"', "Cache-Control": cache_control})
     try:
         gfile = fs.get(oid)
     except Exception:
         abort(404)
-    data = gfile.read()
-    return send_file(
-        BytesIO(data),
+
+    # Stream GridFS chunks straight to the client instead of buffering the
+    # whole file; memory per request stays at one chunk
+    def stream():
+        while True:
+            chunk = gfile.readchunk()
+            if not chunk:
+                break
+            yield chunk
+
+    filename = getattr(gfile, "filename", None) or f"receipt_{id}"
+    headers = {
+        "Content-Disposition": f'inline; filename="{filename}"',
+        "Content-Length": str(gfile.length),
+        "ETag": f'"{etag}"',
+        "Cache-Control": cache_control,
+    }
+    return Response(
+        stream(),
         mimetype=(getattr(gfile, "content_type", None) or "application/octet-stream"),
-        download_name=(getattr(gfile, "filename", None) or f"receipt_{id}"),
-        as_attachment=False,
-        max_age=0,
-        conditional=False
+        headers=headers
     )
 
 # ------------------------------
@@ -406,30 +607,44 @@ def export_csv():
             q["date"]["$lt"] = (end_dt + timedelta(days=1))
 
     if search:
-        q["$or"] = [
-            {"vendor": {"$regex": search, "$options": "i"}},
-            {"notes": {"$regex": search, "$options": "i"}},
-        ]
+        q.update(_search_filter(search))
 
-    cursor = expenses_col.find(q).sort("date", DESCENDING)
+    # Large batches mean far fewer getMore round-trips on big exports
+    cursor = (expenses_col.find(q, EXPORT_PROJECTION)
+              .sort([("date", DESCENDING), ("_id", DESCENDING)])
+              .batch_size(1000))
 
     def generate():
-        yield "id,date,vendor,category,amount,notes,receipt_id,created_at\n"
+        # Write rows through csv.writer into a small reusable buffer so values
+        # are quoted properly; yield it in ~64KB pieces rather than per row.
+        buf = StringIO()
+        writerow = csv.writer(buf, lineterminator="\n").writerow
+        tell = buf.tell
+
+        def flush():
+            data = buf.getvalue()
+            buf.seek(0)
+            buf.truncate(0)
+            return data
+
+        writerow(["id", "date", "vendor", "category", "amount", "notes", "receipt_id", "created_at"])
         for d in cursor:
+            dt = d.get("date")
             created = d.get("created_at")
-            created_s = created.isoformat() if isinstance(created, datetime) else (created or "")
-            date_s = d.get("date").strftime("%Y-%m-%d") if isinstance(d.get("date"), datetime) else (d.get("date") or "")
-            row = [
+            receipt_id = d.get("receipt_id")
+            writerow([
                 str(d["_id"]),
-                date_s,
-                d.get("vendor", "") or "",
-                d.get("category", "") or "",
+                f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d}" if isinstance(dt, datetime) else (dt or ""),
+                d.get("vendor") or "",
+                d.get("category") or "",
                 f'{d.get("amount", 0):.2f}',
-                (d.get("notes", "").replace("\n", " ").replace(",", " ")),
-                (str(d.get("receipt_id")) if d.get("receipt_id") else ""),
-                created_s,
-            ]
-            yield ",".join(row) + "\n"
+                d.get("notes") or "",
+                str(receipt_id) if receipt_id else "",
+                created.isoformat() if isinstance(created, datetime) else (created or ""),
+            ])
+            if tell() >= 65536:
+                yield flush()
+        yield flush()
 
     headers = {
         "Content-Disposition": "attachment; filename=expenses_export.csv",
@@ -437,6 +652,82 @@ def export_csv():
     }
     return Response(generate(), headers=headers)
 
+# ------------------------------
+# CSV import
+# ------------------------------
+def _bulk_insert(docs):
+    """Insert docs in one unordered bulk_write; return (inserted, failed)."""
+    try:
+        res = expenses_col.bulk_write([InsertOne(d) for d in docs], ordered=False)
+        return res.inserted_count, 0
+    except BulkWriteError as e:
+        # Unordered: the rest of the batch is still written past a bad doc
+        inserted = e.details.get("nInserted", 0)
+        return inserted, len(docs) - inserted
+
+@app.route("/import", methods=["GET", "POST"])
+@require_login
+def import_csv():
+    if request.method == "POST":
+        upload = request.files.get("file")
+        if not upload or not upload.filename:
+            flash("Choose a CSV file to import.", "error")
+            return redirect(url_for("import_csv"))
+
+        # Accepts the /export.csv layout; id / receipt_id columns are ignored.
+        # Rows are inserted in unordered bulk batches so a large file is a
+        # handful of round-trips rather than one per row.
+        reader = csv.DictReader(TextIOWrapper(upload.stream, encoding="utf-8-sig", newline=""))
+        now = _now_utc()
+        imported = skipped = rejected = 0
+        batch = []
+        try:
+            for r in reader:
+                try:
+                    vendor = (r.get("vendor") or "").strip()
+                    doc = {
+                        "date": _parse_date((r.get("date") or "").strip()) or now,
+                        "vendor": vendor,
+                        "vendor_lc": vendor.lower(),
+                        "category": (r.get("category") or "").strip(),
+                        "amount": float((r.get("amount") or "").strip()),
+                        "notes": (r.get("notes") or "").strip(),
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                except ValueError:
+                    skipped += 1
+                    continue
+                batch.append(doc)
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    ok, failed = _bulk_insert(batch)
+                    imported += ok
+                    rejected += failed
+                    batch = []
+            if batch:
+                ok, failed = _bulk_insert(batch)
+                imported += ok
+                rejected += failed
+        except (UnicodeDecodeError, csv.Error) as e:
+            if imported:
+                _invalidate_categories()
+            reason = ("File must be UTF-8 encoded CSV." if isinstance(e, UnicodeDecodeError)
+                      else f"File is not a valid CSV ({e}).")
+            flash(f"{reason} Imported {imported} expenses before the error.", "error")
+            return redirect(url_for("import_csv"))
+
+        if imported:
+            _invalidate_categories()
+        msg = f"Imported {imported} expenses."
+        if skipped:
+            msg += f" Skipped {skipped} invalid rows."
+        if rejected:
+            msg += f" {rejected} rows were rejected by the server."
+        flash(msg, "success")
+        return redirect(url_for("expenses"))
+
+    return render_template("import.html", title=APP_TITLE)
+
 # ------------------------------
 # Inline CSS / Templates
 # ------------------------------
@@ -476,6 +767,29 @@ label{ color:#bcd0f0; font-size:14px; }
 }
 """
 
+# Serve BASE_CSS as a cacheable stylesheet instead of inlining it in every
+# page. The URL carries a content hash so it can be cached as immutable.
+CSS_BYTES = BASE_CSS.encode()
+CSS_GZIP = gzip.compress(CSS_BYTES)
+CSS_VERSION = hashlib.sha1(CSS_BYTES).hexdigest()[:12]
+app.jinja_env.globals["css_version"] = CSS_VERSION
+
+@app.route("/app.css")
+def css():
+    gz = request.accept_encodings["gzip"] > 0  # "gzip;q=0" means refused
+    # Each encoding is a distinct representation, so it gets its own ETag
+    etag = f"{CSS_VERSION}-gz" if gz else CSS_VERSION
+    headers = {
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Vary": "Accept-Encoding",
+        "ETag": f'"{etag}"',
+    }
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+    if gz:
+        headers["Content-Encoding"] = "gzip"
+    return Response(CSS_GZIP if gz else CSS_BYTES, mimetype="text/css", headers=headers)
+
 BASE_TMPL = """
 <!doctype html>
 <html>
@@ -483,7 +797,7 @@ BASE_TMPL = """
   <meta charset="utf-8"/>
   <meta name="viewport" content="width=device-width, initial-scale=1"/>
   <title>{{ title }}</title>
-  <style>{{ css }}</style>
+  <link rel="stylesheet" href="{{ url_for('css', v=css_version) }}"/>
 </head>
 <body>
   <div class="container">
@@ -517,9 +831,6 @@ BASE_TMPL = """
 </html>
 """
 
-# Provide base.html from memory so no templates/ folder is required
-
-
 LOGIN_TEMPLATE = """
 <!doctype html>
 <html>
@@ -527,12 +838,13 @@ LOGIN_TEMPLATE = """
   <meta charset="utf-8"/>
   <meta name="viewport" content="width=device-width, initial-scale=1"/>
   <title>{{ title }} – Login</title>
-  <style>{{ css }}</style>
+  <link rel="stylesheet" href="{{ url_for('css', v=css_version) }}"/>
 </head>
 <body>
   <div class="container">
     <div class="card" style="max-width:420px; margin:60px auto;">
       <div class="header-title" style="margin-bottom:12px;">{{ title }} – Login</div>
+      {% if error %}<div class="flash error">{{ error }}</div>{% endif %}
       <form method="post" class="grid">
         <div>
             <label>Username</label>
@@ -598,16 +910,16 @@ DASHBOARD_TEMPLATE = """
       <tbody>
         {% for r in recent %}
         <tr>
-          <td data-label="Date">{{ r['date'] }}</td>
-          <td data-label="Vendor">{{ r['vendor'] or '-' }}</td>
-          <td data-label="Category"><span class="badge">{{ r['category'] or 'Uncategorized' }}</span></td>
-          <td data-label="Amount">${{ '%.2f'|format(r['amount']) }}</td>
+          <td data-label="Date">{{ r.date }}</td>
+          <td data-label="Vendor">{{ r.vendor or '-' }}</td>
+          <td data-label="Category"><span class="badge">{{ r.category or 'Uncategorized' }}</span></td>
+          <td data-label="Amount">${{ '%.2f'|format(r.amount) }}</td>
           <td data-label="Receipt">
-            {% if r['receipt_id'] %}
-              <a href="{{ url_for('receipts', id=r['receipt_id']) }}" target="_blank">View</a>
+            {% if r.receipt_id %}
+              <a href="{{ url_for('receipts', id=r.receipt_id) }}" target="_blank">View</a>
             {% else %}-{% endif %}
           </td>
-          <td data-label="Notes">{{ r['notes'] or '' }}</td>
+          <td data-label="Notes">{{ r.notes or '' }}</td>
         </tr>
         {% else %}
         <tr><td colspan="6">No recent expenses.</td></tr>
@@ -623,7 +935,11 @@ INDEX_TEMPLATE = """
 {% extends 'base.html' %}
 {% block content %}
 <form method="get" class="grid cols-4" style="margin-bottom:12px;">
-  <!-- start / end / category / search fields stay the same ... -->
+  <!-- start / end / category fields stay the same ... -->
+  <div>
+    <label>Search</label>
+    <input type="text" name="search" value="{{ filters.search }}" placeholder="Vendor or notes words, or vendor prefix*"/>
+  </div>
 
   <!-- ACTIONS: keep Apply + Reset together -->
   <div class="form-actions">
@@ -634,7 +950,8 @@ INDEX_TEMPLATE = """
   <!-- remove the two empty filler divs -->
 
   <!-- Export on the right (or full-width on mobile) -->
-  <div class="form-export">
+  <div class="form-export" style="gap:8px;">
+    <a class="btn" href="{{ url_for('import_csv') }}">Import CSV</a>
     <a class="btn" href="{{ url_for('export_csv', **filters) }}">Export CSV</a>
   </div>
 </form>
@@ -643,6 +960,7 @@ INDEX_TEMPLATE = """
 <div class="section-title">Filtered Total</div>
 <div style="margin-bottom:10px; font-size:18px; font-weight:700;">
   ${{ '%.2f'|format(total or 0) }}
+  <span class="muted" style="font-size:14px;">({{ count }} expense{{ '' if count == 1 else 's' }})</span>
 </div>
 
 <div class="table-wrap">
@@ -661,20 +979,20 @@ INDEX_TEMPLATE = """
   <tbody>
       {% for r in rows %}
       <tr>
-        <td data-label="Date">{{ r['date'] }}</td>
-        <td data-label="Vendor">{{ r['vendor'] or '-' }}</td>
-        <td data-label="Category"><span class="badge">{{ r['category'] or 'Uncategorized' }}</span></td>
-        <td data-label="Amount">${{ '%.2f'|format(r['amount']) }}</td>
+        <td data-label="Date">{{ r.date }}</td>
+        <td data-label="Vendor">{{ r.vendor or '-' }}</td>
+        <td data-label="Category"><span class="badge">{{ r.category or 'Uncategorized' }}</span></td>
+        <td data-label="Amount">${{ '%.2f'|format(r.amount) }}</td>
         <td data-label="Receipt">
-            {% if r['receipt_id'] %}
-            <a href="{{ url_for('receipts', id=r['receipt_id']) }}" target="_blank">View</a>
+            {% if r.receipt_id %}
+            <a href="{{ url_for('receipts', id=r.receipt_id) }}" target="_blank">View</a>
             {% else %}-{% endif %}
         </td>
-        <td data-label="Notes">{{ r['notes'] or '' }}</td>
+        <td data-label="Notes">{{ r.notes or '' }}</td>
         <td data-label="Actions">
             <div class="card-actions">
-            <a class="btn" href="{{ url_for('edit', expense_id=r['id']) }}">Edit</a>
-            <form method="post" action="{{ url_for('delete', expense_id=r['id']) }}" onsubmit="return confirm('Delete this expense?');">
+            <a class="btn" href="{{ url_for('edit', expense_id=r.id) }}">Edit</a>
+            <form method="post" action="{{ url_for('delete', expense_id=r.id) }}" onsubmit="return confirm('Delete this expense?');">
                 <button class="btn danger" type="submit">Delete</button>
             </form>
             </div>
@@ -687,6 +1005,18 @@ INDEX_TEMPLATE = """
   </tbody>
   </table>
 </div>
+
+{% if pages > 1 %}
+<div class="form-actions" style="justify-content:space-between; margin-top:12px;">
+  {% if page > 1 %}
+    <a class="btn" href="{{ url_for('expenses', page=page-1, **filters) }}">&larr; Prev</a>
+  {% else %}<span></span>{% endif %}
+  <span class="muted">Page {{ page }} of {{ pages }}</span>
+  {% if page < pages %}
+    <a class="btn" href="{{ url_for('expenses', page=page+1, **filters) }}">Next &rarr;</a>
+  {% else %}<span></span>{% endif %}
+</div>
+{% endif %}
 {% endblock %}
 """
 
@@ -739,28 +1069,28 @@ EDIT_TEMPLATE = """
 <form method="post" enctype="multipart/form-data" class="grid cols-2">
   <div>
     <label>Date</label>
-    <input type="date" name="date" value="{{ row['date'] }}" required/>
+    <input type="date" name="date" value="{{ row.date }}" required/>
   </div>
   <div>
     <label>Amount (USD)</label>
-    <input type="number" step="0.01" name="amount" value="{{ row['amount'] }}" required/>
+    <input type="number" step="0.01" name="amount" value="{{ row.amount }}" required/>
   </div>
   <div>
     <label>Vendor</label>
-    <input type="text" name="vendor" value="{{ row['vendor'] or '' }}"/>
+    <input type="text" name="vendor" value="{{ row.vendor or '' }}"/>
   </div>
   <div>
     <label>Category</label>
-    <input type="text" name="category" value="{{ row['category'] or '' }}"/>
+    <input type="text" name="category" value="{{ row.category or '' }}"/>
   </div>
   <div class="field receipt-row span-2">
     <label for="receipt-edit">Receipt <span class="muted">(upload new to replace)</span></label>
     <div class="file-control">
         <input id="receipt-edit" class="file-input" type="file" name="receipt" accept="image/*,application/pdf"/>
     </div>
-    {% if row['receipt_id'] %}
+    {% if row.receipt_id %}
         <div class="span-2" style="margin-top:6px;">
-        <a href="{{ url_for('receipts', id=row['receipt_id']) }}" target="_blank">Current receipt</a>
+        <a href="{{ url_for('receipts', id=row.receipt_id) }}" target="_blank">Current receipt</a>
         </div>
     {% endif %}
     </div>
@@ -769,7 +1099,7 @@ EDIT_TEMPLATE = """
     </div>
   <div style="grid-column:1/-1;">
     <label>Notes</label>
-    <textarea name="notes" rows="3">{{ row['notes'] or '' }}</textarea>
+    <textarea name="notes" rows="3">{{ row.notes or '' }}</textarea>
   </div>
   <div style="grid-column:1/-1; display:flex; gap:8px; justify-content:flex-end;">
     <a class="btn" href="{{ url_for('expenses') }}">Cancel</a>
@@ -779,6 +1109,41 @@ EDIT_TEMPLATE = """
 {% endblock %}
 """
 
+IMPORT_TEMPLATE = """
+{% extends 'base.html' %}
+{% block content %}
+<h3>Import Expenses</h3>
+<form method="post" enctype="multipart/form-data" class="grid">
+  <div class="field">
+    <label for="import-file">CSV file <span class="muted">(columns: date, vendor, category, amount, notes)</span></label>
+    <div class="file-control">
+        <input id="import-file" class="file-input" type="file" name="file" accept=".csv,text/csv" required/>
+    </div>
+  </div>
+  <div class="form-actions-bar">
+    <a class="btn" href="{{ url_for('expenses') }}">Cancel</a>
+    <button class="btn primary" type="submit">Import</button>
+  </div>
+</form>
+{% endblock %}
+"""
+
+# Register templates with a loader so Jinja compiles each one once and
+# caches it by name. templates/base.html wins when present; BASE_TMPL is the
+# in-memory fallback so no templates/ folder is required.
+app.jinja_loader = ChoiceLoader([
+    app.jinja_loader,
+    DictLoader({
+        "base.html": BASE_TMPL,
+        "login.html": LOGIN_TEMPLATE,
+        "dashboard.html": DASHBOARD_TEMPLATE,
+        "expenses.html": INDEX_TEMPLATE,
+        "add.html": ADD_TEMPLATE,
+        "edit.html": EDIT_TEMPLATE,
+        "import.html": IMPORT_TEMPLATE,
+    }),
+])
+
 # ------------------------------
 # Main
 # ------------------------------